@@ -36,9 +36,10 @@ __status__ = 'Development'
 from typing import Any, Iterable, Iterator, Mapping, Optional, Sequence, Type, Union
 import sqlite3
 from sqlite3 import *
-from datetime import date, datetime
+import json
 from os import PathLike
 import re
+from time import time_ns
 
 
 # language=sql
@@ -50,6 +51,17 @@ _SQL_TRANSACTION_COMMIT = '''
     COMMIT TRANSACTION;
     '''
 # language=sql
+_SQL_TRANSACTION_ROLLBACK = '''
+    ROLLBACK TRANSACTION;
+    '''
+# language=sql
+_SQL_CREATE_TABLE_SQLITE6NF_TRANSACTION = '''
+    CREATE TABLE IF NOT EXISTS "sqlite6nf_transaction" (
+        "id" INTEGER PRIMARY KEY,
+        "transaction" INTEGER NOT NULL
+        );
+    '''
+# language=sql
 _SQL_CREATE_TABLE_SQLITE6NF_TABLE = '''
     CREATE TABLE IF NOT EXISTS "sqlite6nf_table" (
         "id" INTEGER PRIMARY KEY
@@ -59,21 +71,26 @@ _SQL_CREATE_TABLE_SQLITE6NF_TABLE = '''
 _SQL_CREATE_TABLE_SQLITE6NF_TABLE_EXIST = '''
     CREATE TABLE IF NOT EXISTS "sqlite6nf_table_exist" (
         "id" INTEGER NOT NULL,
-        "transaction" TEXT NOT NULL,
+        "transaction" INTEGER NOT NULL,
         "exist" INTEGER NOT NULL,
         PRIMARY KEY ("id", "transaction"),
         FOREIGN KEY ("id") REFERENCES "sqlite6nf_table"("id")
-        );
+        ) WITHOUT ROWID;
     '''
 # language=sql
 _SQL_CREATE_TABLE_SQLITE6NF_TABLE_NAME = '''
     CREATE TABLE IF NOT EXISTS "sqlite6nf_table_name" (
         "id" INTEGER NOT NULL,
-        "transaction" TEXT NOT NULL,
+        "transaction" INTEGER NOT NULL,
         "name" INTEGER NOT NULL,
         PRIMARY KEY ("id", "transaction"),
         FOREIGN KEY ("id") REFERENCES "sqlite6nf_table"("id")
-        );
+        ) WITHOUT ROWID;
+    '''
+# language=sql
+_SQL_CREATE_INDEX_SQLITE6NF_TABLE_NAME_NAME = '''
+    CREATE INDEX IF NOT EXISTS "sqlite6nf_table_name_name"
+    ON "sqlite6nf_table_name" ("name");
     '''
 # language=sql
 _SQL_CREATE_TABLE_SQLITE6NF_COLUMN = '''
@@ -84,24 +101,29 @@ _SQL_CREATE_TABLE_SQLITE6NF_COLUMN = '''
         );
     '''
 # language=sql
+_SQL_CREATE_INDEX_SQLITE6NF_COLUMN_TABLE_ID = '''
+    CREATE INDEX IF NOT EXISTS "sqlite6nf_column_table_id"
+    ON "sqlite6nf_column" ("table_id");
+    '''
+# language=sql
 _SQL_CREATE_TABLE_SQLITE6NF_COLUMN_EXIST = '''
     CREATE TABLE IF NOT EXISTS "sqlite6nf_column_exist" (
         "id" INTEGER NOT NULL,
-        "transaction" TEXT NOT NULL,
+        "transaction" INTEGER NOT NULL,
         "exist" INTEGER NOT NULL,
         PRIMARY KEY ("id", "transaction"),
         FOREIGN KEY ("id") REFERENCES "sqlite6nf_column"("id")
-        );
+        ) WITHOUT ROWID;
     '''
 # language=sql
 _SQL_CREATE_TABLE_SQLITE6NF_COLUMN_NAME = '''
     CREATE TABLE IF NOT EXISTS "sqlite6nf_column_name" (
         "id" INTEGER NOT NULL,
-        "transaction" TEXT NOT NULL,
+        "transaction" INTEGER NOT NULL,
         "name" INTEGER NOT NULL,
         PRIMARY KEY ("id", "transaction"),
         FOREIGN KEY ("id") REFERENCES "sqlite6nf_column"("id")
-        );
+        ) WITHOUT ROWID;
     '''
 # language=sql
 _SQL_CREATE_TABLE_SQLITE6NF_INSTANCE = '''
@@ -113,34 +135,41 @@ _SQL_CREATE_TABLE_SQLITE6NF_INSTANCE = '''
 _SQL_CREATE_TABLE_SQLITE6NF_INSTANCE_EXIST = '''
     CREATE TABLE IF NOT EXISTS "sqlite6nf_{table_id}_exist" (
         "id" INTEGER NOT NULL,
-        "transaction" TEXT NOT NULL,
+        "transaction" INTEGER NOT NULL,
         "exist" INTEGER NOT NULL,
         PRIMARY KEY ("id", "transaction"),
         FOREIGN KEY ("id") REFERENCES "sqlite6nf_{table_id}"("id")
-        );
+        ) WITHOUT ROWID;
     '''
 # language=sql
 _SQL_CREATE_TABLE_SQLITE6NF_INSTANCE_VALUE = '''
     CREATE TABLE IF NOT EXISTS "sqlite6nf_{table_id}_{column_id}" (
         "id" INTEGER NOT NULL,
-        "transaction" TEXT NOT NULL,
+        "transaction" INTEGER NOT NULL,
         "value" {dtype},
         PRIMARY KEY ("id", "transaction"),
         FOREIGN KEY ("id") REFERENCES "sqlite6nf_{table_id}"("id")
-        );
+        ) WITHOUT ROWID;
     '''
 # language=sql
 _SQL_CREATE_TRIGGER_SQLITE6NF_TRIGGER_INSERT_INSTANCE = '''
     CREATE TRIGGER IF NOT EXISTS "sqlite6nf_trigger_insert_{table_id}"
     AFTER INSERT ON "{table_name}"
     FOR EACH ROW BEGIN
+        UPDATE "sqlite6nf_transaction"
+        SET "transaction" = sqlite6nf_now("transaction")
+        WHERE "transaction" < sqlite6nf_now("transaction");
+
         INSERT INTO "sqlite6nf_{table_id}"
         ("id")
-        VALUES ("NEW"."rowid");
+        VALUES ("NEW"."rowid")
+        ON CONFLICT ("id") DO NOTHING;
 
         INSERT INTO "sqlite6nf_{table_id}_exist"
         ("id", "transaction", "exist")
-        VALUES ("NEW"."rowid", strftime('%Y-%m-%d %H:%M:%f', 'now'), 1);
+        VALUES ("NEW"."rowid", (SELECT "transaction" FROM "sqlite6nf_transaction"), 1)
+        ON CONFLICT ("id", "transaction") DO UPDATE SET "exist" = "excluded"."exist";
+        {instance_values}
     END;
     '''
 # language=sql
@@ -148,37 +177,52 @@ _SQL_CREATE_TRIGGER_SQLITE6NF_TRIGGER_DELETE_INSTANCE = '''
     CREATE TRIGGER IF NOT EXISTS "sqlite6nf_trigger_delete_{table_id}"
     AFTER DELETE ON "{table_name}"
     FOR EACH ROW BEGIN
+        UPDATE "sqlite6nf_transaction"
+        SET "transaction" = sqlite6nf_now("transaction")
+        WHERE "transaction" < sqlite6nf_now("transaction");
+
         INSERT INTO "sqlite6nf_{table_id}_exist"
         ("id", "transaction", "exist")
-        VALUES ("OLD"."rowid", strftime('%Y-%m-%d %H:%M:%f', 'now'), 0);
+        VALUES ("OLD"."rowid", (SELECT "transaction" FROM "sqlite6nf_transaction"), 0)
+        ON CONFLICT ("id", "transaction") DO UPDATE SET "exist" = "excluded"."exist";
     END;
     '''
+# The per-column statements are added to the body of the insert trigger, so that only 1 trigger fires per row.
 # language=sql
-_SQL_CREATE_TRIGGER_SQLITE6NF_TRIGGER_INSERT_INSTANCE_VALUE = '''
-    CREATE TRIGGER IF NOT EXISTS "sqlite6nf_trigger_insert_{table_id}_{column_id}"
-    AFTER INSERT ON "{table_name}"
-    FOR EACH ROW BEGIN
+_SQL_TRIGGER_BODY_INSERT_INSTANCE_VALUE = '''
         INSERT INTO "sqlite6nf_{table_id}_{column_id}"
         ("id", "transaction", "value")
-        VALUES ("NEW"."rowid", strftime('%Y-%m-%d %H:%M:%f', 'now'), "NEW"."{column_name}");
-    END;
+        VALUES ("NEW"."rowid", (SELECT "transaction" FROM "sqlite6nf_transaction"), "NEW"."{column_name}")
+        ON CONFLICT ("id", "transaction") DO UPDATE SET "value" = "excluded"."value";
     '''
+# Updates that leave the value unchanged do not add a record to the history.
 # language=sql
 _SQL_CREATE_TRIGGER_SQLITE6NF_TRIGGER_UPDATE_INSTANCE_VALUE = '''
     CREATE TRIGGER IF NOT EXISTS "sqlite6nf_trigger_update_{table_id}_{column_id}"
     AFTER UPDATE OF "{column_name}" ON "{table_name}"
-    FOR EACH ROW BEGIN
+    FOR EACH ROW WHEN "NEW"."{column_name}" IS NOT "OLD"."{column_name}" BEGIN
+        UPDATE "sqlite6nf_transaction"
+        SET "transaction" = sqlite6nf_now("transaction")
+        WHERE "transaction" < sqlite6nf_now("transaction");
+
         INSERT INTO "sqlite6nf_{table_id}_{column_id}"
         ("id", "transaction", "value")
-        VALUES ("NEW"."rowid", strftime('%Y-%m-%d %H:%M:%f', 'now'), "NEW"."{column_name}");
+        VALUES ("NEW"."rowid", (SELECT "transaction" FROM "sqlite6nf_transaction"), "NEW"."{column_name}")
+        ON CONFLICT ("id", "transaction") DO UPDATE SET "value" = "excluded"."value";
     END;
     '''
 # language=sql
+_SQL_INSERT_INTO_SQLITE6NF_TRANSACTION = '''
+    INSERT INTO "sqlite6nf_transaction"
+    ("id", "transaction")
+    VALUES (1, 0)
+    ON CONFLICT ("id") DO NOTHING;
+    '''
+# language=sql
 _SQL_INSERT_INTO_SQLITE6NF_TABLE = '''
     INSERT OR ROLLBACK INTO "sqlite6nf_table"
     ("id")
-    VALUES (NULL)
-    RETURNING *;
+    VALUES (:id);
     '''
 # language=sql
 _SQL_INSERT_INTO_SQLITE6NF_TABLE_EXIST = '''
@@ -196,8 +240,7 @@ _SQL_INSERT_INTO_SQLITE6NF_TABLE_NAME = '''
 _SQL_INSERT_INTO_SQLITE6NF_COLUMN = '''
     INSERT OR ROLLBACK INTO "sqlite6nf_column"
     ("id", "table_id")
-    VALUES (NULL, :table_id)
-    RETURNING *;
+    VALUES (:id, :table_id);
     '''
 # language=sql
 _SQL_INSERT_INTO_SQLITE6NF_COLUMN_EXIST = '''
@@ -230,28 +273,91 @@ _SQL_INSERT_INTO_SQLITE6NF_INSTANCE_VALUE = '''
     ("id", "transaction", "value")
     VALUES (:id, :transaction, :value);
     '''
+# The rowid is not quoted, so that a table without a rowid raises an error instead of storing the string 'rowid'.
+# language=sql
+_SQL_INSERT_INTO_SQLITE6NF_INSTANCE_SELECT = '''
+    INSERT OR ROLLBACK INTO "sqlite6nf_{table_id}"
+    ("id")
+    SELECT rowid
+    FROM "{table_name}";
+    '''
+# language=sql
+_SQL_INSERT_INTO_SQLITE6NF_INSTANCE_EXIST_SELECT = '''
+    INSERT OR ROLLBACK INTO "sqlite6nf_{table_id}_exist"
+    ("id", "transaction", "exist")
+    SELECT rowid, :transaction, :exist
+    FROM "{table_name}";
+    '''
+# language=sql
+_SQL_INSERT_INTO_SQLITE6NF_INSTANCE_VALUE_SELECT = '''
+    INSERT OR ROLLBACK INTO "sqlite6nf_{table_id}_{column_id}"
+    ("id", "transaction", "value")
+    SELECT rowid, :transaction, "{column_name}"
+    FROM "{table_name}";
+    '''
+# language=sql
+_SQL_UPDATE_SQLITE6NF_TRANSACTION = '''
+    UPDATE "sqlite6nf_transaction"
+    SET "transaction" = sqlite6nf_now("transaction")
+    WHERE "transaction" < sqlite6nf_now("transaction");
+    '''
+# language=sql
+_SQL_SELECT_FROM_SQLITE6NF_TRANSACTION = '''
+    SELECT "sqlite6nf_transaction"."transaction"
+    FROM "sqlite6nf_transaction" AS "sqlite6nf_transaction";
+    '''
+# language=sql
+_SQL_SELECT_FROM_SQLITE6NF_TABLE = '''
+    SELECT coalesce(max("sqlite6nf_table"."id"), 0) AS "id"
+    FROM "sqlite6nf_table" AS "sqlite6nf_table";
+    '''
+# language=sql
+_SQL_SELECT_FROM_SQLITE6NF_COLUMN = '''
+    SELECT coalesce(max("sqlite6nf_column"."id"), 0) AS "id"
+    FROM "sqlite6nf_column" AS "sqlite6nf_column";
+    '''
+# Tables without a rowid and virtual tables can not be normalized, because the triggers identify rows by their rowid.
 # language=sql
 _SQL_SELECT_FROM_SQLITE_SCHEMA = '''
-    SELECT "sqlite_schema".*
+    SELECT "sqlite_schema"."name"
     FROM "sqlite_schema" AS "sqlite_schema"
-    LEFT OUTER JOIN (
-        SELECT "sqlite6nf_table_name"."id", "sqlite6nf_table_name"."name", max("sqlite6nf_table_name", "transaction")
-        FROM "sqlite6nf_table_name"
-        GROUP BY "sqlite6nf_table_name"."id"
-        ) AS "sqlite6nf_table_name"
-    ON "sqlite6nf_table_name"."name" = "sqlite_schema"."name"
+    INNER JOIN pragma_table_list("sqlite_schema"."name") AS "pragma_table_list"
+    ON "pragma_table_list"."schema" = 'main'
     WHERE "sqlite_schema"."type" = 'table'
     AND NOT lower("sqlite_schema"."name") GLOB 'sqlite6nf_*'
-    AND "sqlite6nf_table_name"."name" IS NULL;
+    AND "pragma_table_list"."type" = 'table'
+    AND NOT "pragma_table_list"."wr"
+    AND NOT EXISTS (
+        SELECT 1
+        FROM "sqlite6nf_table_name" AS "sqlite6nf_table_name"
+        WHERE "sqlite6nf_table_name"."name" = "sqlite_schema"."name"
+        AND "sqlite6nf_table_name"."transaction" = (
+            SELECT max("sqlite6nf_table_name_latest"."transaction")
+            FROM "sqlite6nf_table_name" AS "sqlite6nf_table_name_latest"
+            WHERE "sqlite6nf_table_name_latest"."id" = "sqlite6nf_table_name"."id"
+            )
+        );
     '''
+# The names of the tables are passed as a JSON array, so that only the columns of these tables are retrieved.
 # language=sql
 _SQL_SELECT_FROM_PRAGMA_TABLE_INFO = '''
-    SELECT "pragma_table_info".*
-    FROM "sqlite_schema" AS "sqlite_schema"
-    LEFT JOIN pragma_table_info("sqlite_schema"."name") AS "pragma_table_info"
-    WHERE "sqlite_schema"."type" = 'table'
-    AND NOT lower("sqlite_schema"."name") GLOB 'sqlite6nf_*'
-    AND "sqlite_schema"."name" = :name;
+    SELECT "json_each"."value" AS "table_name", "pragma_table_info"."name", "pragma_table_info"."type"
+    FROM json_each(:tables) AS "json_each"
+    INNER JOIN pragma_table_info("json_each"."value") AS "pragma_table_info"
+    ORDER BY "json_each"."key", "pragma_table_info"."cid";
+    '''
+# language=sql
+_SQL_PRAGMA = '''
+    PRAGMA {name} = {value};
+    '''
+# language=sql
+_SQL_SELECT_FROM_PRAGMA_PRAGMA_LIST = '''
+    SELECT "pragma_pragma_list"."name"
+    FROM pragma_pragma_list AS "pragma_pragma_list";
+    '''
+# language=sql
+_SQL_PRAGMA_FOREIGN_KEYS = '''
+    PRAGMA foreign_keys;
     '''
 
 
@@ -287,7 +393,7 @@ fixed before production version 1.0 is reached.
 # Ending a string with '/*' results in a sqlite3 syntax error.
 _PATTERN_COMMENT_SINGLE_LINE = re.compile(r'''(?x:
     --  # Open
-    (?s:.*?)  # Comment
+    [^\n]*  # Comment
     (?:\n|$)  # Close
     )''')
 _PATTERN_COMMENT_MULTI_LINE = re.compile(r'''(?x:
@@ -348,14 +454,14 @@ _PATTERN_OBJECT = re.compile(rf'''(?x:
     (?:{_PATTERN_OBJECT_SCHEMA.pattern}{_PATTERN_SPACE.pattern}*?\.{_PATTERN_SPACE.pattern}*?)?  # Schema
     {_PATTERN_OBJECT_TABLE.pattern}  # Table
     )''')
-_PATTERN_IGNORE = re.compile(rf'''(?x:
+# The capturing groups are rewritten on the pattern string, so that the pattern only needs to be compiled once.
+_PATTERN_IGNORE_SOURCE = rf'''(?x:
     {_PATTERN_SPACE.pattern}|{_PATTERN_IDENTIFIER_SINGLE_QUOTE.pattern}|{_PATTERN_IDENTIFIER_DOUBLE_QUOTE.pattern}
-        |{_PATTERN_IDENTIFIER_SQUARE_BRACKET.pattern}|{_PATTERN_IDENTIFIER_GRAVE_ACCENT.pattern}|(?s:.)
-    )''')
-# Change all named capturing groups to non-capturing groups.
-_PATTERN_IGNORE = re.compile(re.sub(r'\(\?P<(?s:.*?)>', '(?:', _PATTERN_IGNORE.pattern))
-# Change all unnamed capturing groups to non-capturing groups.
-_PATTERN_IGNORE = re.compile(re.sub(r'\((?!\?)', '(?:', _PATTERN_IGNORE.pattern))
+        |{_PATTERN_IDENTIFIER_SQUARE_BRACKET.pattern}|{_PATTERN_IDENTIFIER_GRAVE_ACCENT.pattern}
+        |[^\s\-/'"\[`;]+|(?s:.)
+    )'''
+# Change all named capturing groups (inner) and all unnamed capturing groups (outer) to non-capturing groups.
+_PATTERN_IGNORE = re.compile(re.sub(r'\((?!\?)', '(?:', re.sub(r'\(\?P<(?s:.*?)>', '(?:', _PATTERN_IGNORE_SOURCE)))
 # '^' and ';' have a different length (0 and 1 respectively) and therefore need a separate lookbehind.
 _PATTERN_QUERY = re.compile(rf'''(?x:
     (?:(?<=^)|(?<=;))  # Open
@@ -418,6 +524,51 @@ _PATTERN_QUERY_SELECT_FROM = re.compile(rf'''(?x:(?P<query>
     {_PATTERN_OBJECT.pattern}  # Object
     (?!{_PATTERN_SPACE.pattern}*?\() # Not a function
     ))''')
+# String literals, quoted identifiers and comments are matched as a whole, so that the 'semicolon' group only
+# matches the semicolons in between. Doubled quotes are matched as two adjacent literals.
+_PATTERN_SEMICOLON = re.compile(r'''(?x:
+    '[^']*'?|"[^"]*"?|`[^`]*`?|\[[^\]]*]?  # Quotes
+    |--[^\n]*|/\*(?s:.*?)(?:\*/|$)  # Comments
+    |(?P<semicolon>;)  # Semicolon
+    )''')
+
+
+def _split(
+        sql_script: str,
+        ) -> Iterator[str]:
+    # A statement ends at the first semicolon after which SQLite considers it to be complete. Semicolons within
+    # string literals, quoted identifiers and comments are skipped beforehand, so that only the semicolons within
+    # trigger bodies need to be checked more than once.
+    start = 0
+    for match in _PATTERN_SEMICOLON.finditer(sql_script):
+        if match['semicolon'] and sqlite3.complete_statement(sql_script[start:match.end()]):
+            yield sql_script[start:match.end()]
+            start = match.end()
+    # The last statement does not need to end with a semicolon.
+    if sql_script[start:].strip():
+        yield sql_script[start:]
+
+
+# The system time is kept in a separate object, so that the SQL function does not hold a reference to the connection.
+class _Clock:
+    def __init__(
+            self: '_Clock',
+            ) -> None:
+        self.transaction: Optional[int] = None
+
+    def now(
+            self: '_Clock',
+            previous: int,
+            ) -> int:
+        # The system time remains the same for an entire transaction.
+        # It is stored as the number of microseconds since the Unix epoch, which keeps the primary keys small.
+        # The system clock can repeat or even go back in time, therefore every transaction receives at least the
+        # microsecond after the previous transaction of the database. The previous transaction is read while the
+        # write lock is held, which orders the transactions of all connections. A previous transaction later than
+        # the system time of this transaction means that the system time was not reset.
+        if self.transaction is None or self.transaction < previous:
+            self.transaction = max(time_ns() // 1000, previous + 1)
+        return self.transaction
 
 
 class Cursor(sqlite3.Cursor):
@@ -427,7 +578,13 @@ class Cursor(sqlite3.Cursor):
             parameters: Union[Sequence[Any], Mapping[str, Any]] = (),
             /,
             ) -> 'Cursor':
+        # The cursor can also be used on a plain sqlite3 connection, which has no system time to reset.
+        if isinstance(self.connection, Connection):
+            self.connection._reset()
         super().execute(sql, parameters)
+        # The statement might have ended the transaction, which must not pass its system time on to the next one.
+        if isinstance(self.connection, Connection):
+            self.connection._reset()
         return self
 
     def executemany(
@@ -436,7 +593,15 @@ class Cursor(sqlite3.Cursor):
             parameters: Union[Sequence[Any], Mapping[str, Any], Iterator[Any]],
             /,
             ) -> 'Cursor':
+        if isinstance(self.connection, Connection):
+            # The implicit BEGIN of sqlite3 is sent before the first set of parameters is retrieved.
+            self.connection._reset()
+            # Outside a transaction every set of parameters is executed in a transaction of its own. The parameters
+            # are retrieved one at a time, which allows the system time to be reset in between.
+            parameters = self.connection._reset_each(parameters)
         super().executemany(sql, parameters)
+        if isinstance(self.connection, Connection):
+            self.connection._reset()
         return self
 
     def executescript(
@@ -444,11 +609,77 @@ class Cursor(sqlite3.Cursor):
             sql_script: str,
             /,
             ) -> 'Cursor':
-        super().executescript(sql_script)
+        if not isinstance(self.connection, Connection):
+            super().executescript(sql_script)
+            return self
+        # A script can contain multiple transactions, which can only be told apart by executing the statements one
+        # at a time. Just like executescript, any pending transaction is committed first and no transactions are
+        # opened implicitly.
+        self.connection.commit()
+        isolation_level = self.connection.isolation_level
+        if isolation_level is not None:
+            self.connection.isolation_level = None
+        try:
+            for statement in _split(sql_script):
+                self.connection._reset()
+                super().execute(statement)
+                # executescript steps through all resulting rows as well.
+                for _ in self:
+                    pass
+        finally:
+            if isolation_level is not None:
+                self.connection.isolation_level = isolation_level
+            self.connection._reset()
         return self
 
 
 class Connection(sqlite3.Connection):
+    def __init__(
+            self: 'Connection',
+            *args: Any,
+            **kwargs: Any,
+            ) -> None:
+        super().__init__(*args, **kwargs)
+        self._clock = _Clock()
+        # The function returns a different value for each transaction and is therefore not deterministic.
+        self.create_function('sqlite6nf_now', 1, self._clock.now)
+
+    def _reset(
+            self: 'Connection',
+            ) -> None:
+        # Outside a transaction every statement starts a new transaction and thus receives a new system time.
+        if not self.in_transaction:
+            self._clock.transaction = None
+
+    def _reset_each(
+            self: 'Connection',
+            parameters: Union[Sequence[Any], Mapping[str, Any], Iterator[Any]],
+            ) -> Iterator[Any]:
+        for parameter in parameters:
+            self._reset()
+            yield parameter
+
+    def commit(
+            self: 'Connection',
+            ) -> None:
+        super().commit()
+        self._reset()
+
+    def rollback(
+            self: 'Connection',
+            ) -> None:
+        super().rollback()
+        self._reset()
+
+    def __exit__(
+            self: 'Connection',
+            *args: Any,
+            ) -> bool:
+        # The context manager commits or rolls back directly, without calling commit() or rollback().
+        result = super().__exit__(*args)
+        self._reset()
+        return result
+
     def cursor(
             self: 'Connection',
             factory: Type['Cursor'] = Cursor,
@@ -490,48 +721,93 @@ class Connection(sqlite3.Connection):
             tables: Union[None, str, Iterable[str]] = None,
             ) -> None:
         cursor = super().cursor()
-        cursor.row_factory = sqlite3.Row
         in_transaction = self.in_transaction
-        if not in_transaction:
-            cursor.execute(_SQL_TRANSACTION_BEGIN)
-        cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_TABLE)
-        cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_TABLE_EXIST)
-        cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_TABLE_NAME)
-        cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_COLUMN)
-        cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_COLUMN_EXIST)
-        cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_COLUMN_NAME)
-        if tables is None:
-            tables = cursor.execute(_SQL_SELECT_FROM_SQLITE_SCHEMA).fetchall()
-            tables = [record['name'] for record in tables]
-        elif isinstance(tables, str):
-            tables = [tables]
-        transaction = datetime.now()
-        exist = 1
-        for table_name in tables:
-            table_id = cursor.execute(_SQL_INSERT_INTO_SQLITE6NF_TABLE).fetchone()['id']
-            table_parameters = {'id': table_id, 'transaction': transaction, 'exist': exist, 'name': table_name}
-            table_format = {'table_id': table_id, 'table_name': table_name.replace('"', '""')}
-            cursor.execute(_SQL_INSERT_INTO_SQLITE6NF_TABLE_EXIST, table_parameters)
-            cursor.execute(_SQL_INSERT_INTO_SQLITE6NF_TABLE_NAME, table_parameters)
-            cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_INSTANCE.format(**table_format))
-            cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_INSTANCE_EXIST.format(**table_format))
-            cursor.execute(_SQL_CREATE_TRIGGER_SQLITE6NF_TRIGGER_INSERT_INSTANCE.format(**table_format))
-            cursor.execute(_SQL_CREATE_TRIGGER_SQLITE6NF_TRIGGER_DELETE_INSTANCE.format(**table_format))
-            columns = cursor.execute(_SQL_SELECT_FROM_PRAGMA_TABLE_INFO, table_parameters).fetchall()
-            columns = [[record['name'], record['type']] for record in columns]
-            for column_name, dtype in columns:
-                column_id = cursor.execute(_SQL_INSERT_INTO_SQLITE6NF_COLUMN, table_format).fetchone()['id']
-                column_parameters = {**table_parameters, 'id': column_id, 'name': column_name}
-                column_format = {**table_format, 'column_id': column_id, 'column_name': column_name.replace('"', '""'),
-                                 'dtype': dtype}
-                cursor.execute(_SQL_INSERT_INTO_SQLITE6NF_COLUMN_EXIST, column_parameters)
-                cursor.execute(_SQL_INSERT_INTO_SQLITE6NF_COLUMN_NAME, column_parameters)
-                cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_INSTANCE_VALUE.format(**column_format))
-                cursor.execute(_SQL_CREATE_TRIGGER_SQLITE6NF_TRIGGER_INSERT_INSTANCE_VALUE.format(**column_format))
-                cursor.execute(_SQL_CREATE_TRIGGER_SQLITE6NF_TRIGGER_UPDATE_INSTANCE_VALUE.format(**column_format))
-        if not in_transaction:
-            cursor.execute(_SQL_TRANSACTION_COMMIT)
-        cursor.close()
+        foreign_keys = None
+        try:
+            # Foreign keys can only be switched outside a transaction. The records created by normalize are
+            # consistent by construction, so checking them would only slow down the bulk inserts.
+            if not in_transaction:
+                foreign_keys = cursor.execute(_SQL_PRAGMA_FOREIGN_KEYS).fetchone()[0]
+                cursor.execute(_SQL_PRAGMA.format(name='foreign_keys', value=0))
+                self._clock.transaction = None
+                cursor.execute(_SQL_TRANSACTION_BEGIN)
+            cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_TRANSACTION)
+            cursor.execute(_SQL_INSERT_INTO_SQLITE6NF_TRANSACTION)
+            cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_TABLE)
+            cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_TABLE_EXIST)
+            cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_TABLE_NAME)
+            cursor.execute(_SQL_CREATE_INDEX_SQLITE6NF_TABLE_NAME_NAME)
+            cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_COLUMN)
+            cursor.execute(_SQL_CREATE_INDEX_SQLITE6NF_COLUMN_TABLE_ID)
+            cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_COLUMN_EXIST)
+            cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_COLUMN_NAME)
+            if tables is None:
+                tables = [name for (name,) in cursor.execute(_SQL_SELECT_FROM_SQLITE_SCHEMA).fetchall()]
+            elif isinstance(tables, str):
+                tables = [tables]
+            else:
+                tables = list(tables)
+            # The columns of all tables are retrieved at once instead of per table.
+            columns = {}
+            for table_name, column_name, dtype in cursor.execute(_SQL_SELECT_FROM_PRAGMA_TABLE_INFO,
+                                                                 {'tables': json.dumps(tables)}):
+                columns.setdefault(table_name, []).append((column_name, dtype))
+            cursor.execute(_SQL_UPDATE_SQLITE6NF_TRANSACTION)
+            transaction = cursor.execute(_SQL_SELECT_FROM_SQLITE6NF_TRANSACTION).fetchone()[0]
+            exist = 1
+            # The ids are allocated up front, so that the records can be inserted in bulk.
+            table_id = cursor.execute(_SQL_SELECT_FROM_SQLITE6NF_TABLE).fetchone()[0]
+            column_id = cursor.execute(_SQL_SELECT_FROM_SQLITE6NF_COLUMN).fetchone()[0]
+            table_rows = []
+            column_rows = []
+            for table_name in tables:
+                table_id += 1
+                table_parameters = {'id': table_id, 'transaction': transaction, 'exist': exist, 'name': table_name}
+                table_format = {'table_id': table_id, 'table_name': table_name.replace('"', '""')}
+                table_rows.append(table_parameters)
+                cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_INSTANCE.format_map(table_format))
+                cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_INSTANCE_EXIST.format_map(table_format))
+                # The shadow tables are populated with the existing rows directly within SQLite.
+                cursor.execute(_SQL_INSERT_INTO_SQLITE6NF_INSTANCE_SELECT.format_map(table_format))
+                cursor.execute(_SQL_INSERT_INTO_SQLITE6NF_INSTANCE_EXIST_SELECT.format_map(table_format),
+                               table_parameters)
+                cursor.execute(_SQL_CREATE_TRIGGER_SQLITE6NF_TRIGGER_DELETE_INSTANCE.format_map(table_format))
+                instance_values = []
+                for column_name, dtype in columns.get(table_name, []):
+                    column_id += 1
+                    column_parameters = {**table_parameters, 'id': column_id, 'table_id': table_id,
+                                         'name': column_name}
+                    column_format = {**table_format, 'column_id': column_id,
+                                     'column_name': column_name.replace('"', '""'), 'dtype': dtype}
+                    column_rows.append(column_parameters)
+                    cursor.execute(_SQL_CREATE_TABLE_SQLITE6NF_INSTANCE_VALUE.format_map(column_format))
+                    cursor.execute(_SQL_INSERT_INTO_SQLITE6NF_INSTANCE_VALUE_SELECT.format_map(column_format),
+                                   column_parameters)
+                    instance_values.append(
+                        _SQL_TRIGGER_BODY_INSERT_INSTANCE_VALUE.format_map(column_format))
+                    cursor.execute(
+                        _SQL_CREATE_TRIGGER_SQLITE6NF_TRIGGER_UPDATE_INSTANCE_VALUE.format_map(column_format))
+                cursor.execute(_SQL_CREATE_TRIGGER_SQLITE6NF_TRIGGER_INSERT_INSTANCE.format_map(
+                    {**table_format, 'instance_values': ''.join(instance_values)}))
+            # The records are inserted in bulk, so that each statement is only prepared once.
+            cursor.executemany(_SQL_INSERT_INTO_SQLITE6NF_TABLE, table_rows)
+            cursor.executemany(_SQL_INSERT_INTO_SQLITE6NF_TABLE_EXIST, table_rows)
+            cursor.executemany(_SQL_INSERT_INTO_SQLITE6NF_TABLE_NAME, table_rows)
+            cursor.executemany(_SQL_INSERT_INTO_SQLITE6NF_COLUMN, column_rows)
+            cursor.executemany(_SQL_INSERT_INTO_SQLITE6NF_COLUMN_EXIST, column_rows)
+            cursor.executemany(_SQL_INSERT_INTO_SQLITE6NF_COLUMN_NAME, column_rows)
+            if not in_transaction:
+                cursor.execute(_SQL_TRANSACTION_COMMIT)
+        except BaseException:
+            if not in_transaction and self.in_transaction:
+                cursor.execute(_SQL_TRANSACTION_ROLLBACK)
+            raise
+        finally:
+            # The original setting is also restored when the transaction could not be started.
+            if foreign_keys is not None:
+                cursor.execute(_SQL_PRAGMA.format(name='foreign_keys', value=foreign_keys))
+            cursor.close()
+            self._reset()
         return
 
 
@@ -544,6 +820,27 @@ def connect(
         factory: Type['Connection'] = Connection,
         cached_statements: int = 128,
         uri: bool = False,
+        pragmas: Optional[Mapping[str, Union[str, int]]] = None,
         ) -> 'Connection':
-    connection = sqlite3.connect(**locals())
+    connection = sqlite3.connect(database, timeout=timeout, detect_types=detect_types, isolation_level=isolation_level,
+                                 check_same_thread=check_same_thread, factory=factory,
+                                 cached_statements=cached_statements, uri=uri)
+    # Pragma values can not be bound as parameters, therefore text values are quoted as SQLite literals instead.
+    # For example pragmas={'journal_mode': 'WAL', 'synchronous': 'NORMAL'} greatly reduces the cost of commits.
+    # A pragma can be prefixed by a schema, as in 'main.cache_size', in which case both are quoted separately.
+    if pragmas is not None:
+        try:
+            names = {name for (name,) in connection.execute(_SQL_SELECT_FROM_PRAGMA_PRAGMA_LIST)}
+            for name, value in pragmas.items():
+                *schema, pragma = name.rsplit('.', 1)
+                # SQLite silently ignores unknown pragmas.
+                if pragma.lower() not in names:
+                    raise ValueError('Unknown pragma: {}'.format(name))
+                if isinstance(value, str):
+                    value = "'{}'".format(value.replace("'", "''"))
+                name = '.'.join('"{}"'.format(part.replace('"', '""')) for part in [*schema, pragma])
+                connection.execute(_SQL_PRAGMA.format(name=name, value=value))
+        except BaseException:
+            connection.close()
+            raise
     return connection
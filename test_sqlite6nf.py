@@ -0,0 +1,254 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import sqlite6nf
+
+
+class TestSystemTime(unittest.TestCase):
+    def setUp(
+            self: 'TestSystemTime',
+            ) -> None:
+        self.connection = sqlite6nf.connect(':memory:')
+        self.connection.execute('CREATE TABLE "t" ("a");')
+        self.connection.commit()
+        self.connection.normalize()
+
+    def tearDown(
+            self: 'TestSystemTime',
+            ) -> None:
+        self.connection.close()
+
+    def history(
+            self: 'TestSystemTime',
+            ) -> list:
+        return [value for (value,) in self.connection.execute(
+            'SELECT "value" FROM "sqlite6nf_1_1" ORDER BY "transaction";')]
+
+    def test_transaction(
+            self: 'TestSystemTime',
+            ) -> None:
+        self.connection.execute('INSERT INTO "t" VALUES (1);')
+        self.connection.execute('UPDATE "t" SET "a" = 2;')
+        self.connection.commit()
+        self.assertEqual(self.history(), [2])
+
+    def test_conflict_clause(
+            self: 'TestSystemTime',
+            ) -> None:
+        # The conflict clause of the statement overrides the conflict clause within the triggers.
+        for value, conflict in enumerate(['ABORT', 'FAIL', 'IGNORE', 'REPLACE', 'ROLLBACK'], 2):
+            with self.subTest(conflict=conflict):
+                self.connection.execute('DELETE FROM "t";')
+                self.connection.execute('INSERT INTO "t" VALUES (1);')
+                self.connection.execute('UPDATE OR {} "t" SET "a" = {};'.format(conflict, value))
+                self.connection.commit()
+                self.assertEqual(self.history()[-1], value)
+
+    def test_reinsert(
+            self: 'TestSystemTime',
+            ) -> None:
+        self.connection.execute('INSERT INTO "t" ("rowid", "a") VALUES (1, 1);')
+        self.connection.commit()
+        self.connection.execute('DELETE FROM "t";')
+        self.connection.commit()
+        self.connection.execute('INSERT INTO "t" ("rowid", "a") VALUES (1, 2);')
+        self.connection.commit()
+        self.assertEqual(self.history(), [1, 2])
+        self.assertEqual([exist for (exist,) in self.connection.execute(
+            'SELECT "exist" FROM "sqlite6nf_1_exist" ORDER BY "transaction";')], [1, 0, 1])
+
+    def test_commit(
+            self: 'TestSystemTime',
+            ) -> None:
+        self.connection.execute('INSERT INTO "t" VALUES (1);')
+        self.connection.commit()
+        self.connection.cursor(sqlite3.Cursor).execute('UPDATE "t" SET "a" = 2;')
+        self.connection.commit()
+        self.assertEqual(self.history(), [1, 2])
+
+    def test_context_manager(
+            self: 'TestSystemTime',
+            ) -> None:
+        with self.connection:
+            self.connection.execute('INSERT INTO "t" VALUES (1);')
+        with self.connection:
+            self.connection.executemany('UPDATE "t" SET "a" = ?;', [(2,)])
+        with self.connection:
+            self.connection.executemany('UPDATE "t" SET "a" = ?;', [(3,)])
+        with self.connection:
+            self.connection.cursor(sqlite3.Cursor).execute('UPDATE "t" SET "a" = 4;')
+        self.assertEqual(self.history(), [1, 2, 3, 4])
+
+    def test_executemany_autocommit(
+            self: 'TestSystemTime',
+            ) -> None:
+        self.connection.isolation_level = None
+        self.connection.execute('INSERT INTO "t" VALUES (0);')
+        self.connection.executemany('UPDATE "t" SET "a" = ?;', [(1,), (2,), (3,)])
+        self.assertEqual(self.history(), [0, 1, 2, 3])
+
+    def test_executemany_transaction(
+            self: 'TestSystemTime',
+            ) -> None:
+        self.connection.execute('INSERT INTO "t" VALUES (0);')
+        self.connection.executemany('UPDATE "t" SET "a" = ?;', [(1,), (2,), (3,)])
+        self.connection.commit()
+        self.assertEqual(self.history(), [3])
+
+    def test_executescript_transactions(
+            self: 'TestSystemTime',
+            ) -> None:
+        self.connection.executescript('''
+            BEGIN; INSERT INTO "t" VALUES (1); COMMIT;
+            BEGIN; UPDATE "t" SET "a" = 2; UPDATE "t" SET "a" = 3; COMMIT;
+            UPDATE "t" SET "a" = 4;
+            ''')
+        self.assertEqual(self.history(), [1, 3, 4])
+
+
+class TestSystemTimeOrder(unittest.TestCase):
+    def test_connections(
+            self: 'TestSystemTimeOrder',
+            ) -> None:
+        # A clock that does not advance at all still orders the transactions of all connections.
+        with tempfile.TemporaryDirectory() as directory, mock.patch('sqlite6nf.time_ns', return_value=10 ** 9):
+            database = os.path.join(directory, 'database.sqlite')
+            first = sqlite6nf.connect(database)
+            second = sqlite6nf.connect(database)
+            first.execute('CREATE TABLE "t" ("a");')
+            first.commit()
+            first.normalize()
+            first.execute('INSERT INTO "t" VALUES (1);')
+            first.commit()
+            second.execute('UPDATE "t" SET "a" = 2;')
+            second.commit()
+            first.execute('UPDATE "t" SET "a" = 3;')
+            first.commit()
+            self.assertEqual(first.execute('SELECT "transaction" FROM "sqlite6nf_table_exist";').fetchall(),
+                             [(10 ** 6,)])
+            self.assertEqual(first.execute('SELECT "transaction", "value" FROM "sqlite6nf_1_1";').fetchall(),
+                             [(10 ** 6 + 1, 1), (10 ** 6 + 2, 2), (10 ** 6 + 3, 3)])
+            first.close()
+            second.close()
+
+
+class TestNormalize(unittest.TestCase):
+    def setUp(
+            self: 'TestNormalize',
+            ) -> None:
+        self.connection = sqlite6nf.connect(':memory:')
+
+    def tearDown(
+            self: 'TestNormalize',
+            ) -> None:
+        self.connection.close()
+
+    def tables(
+            self: 'TestNormalize',
+            ) -> list:
+        return [name for (name,) in self.connection.execute(
+            'SELECT "name" FROM "sqlite6nf_table_name" ORDER BY "id";')]
+
+    def test_tables(
+            self: 'TestNormalize',
+            ) -> None:
+        self.connection.executescript('''
+            CREATE TABLE "t" ("a", "b");
+            CREATE TABLE "u" ("c");
+            CREATE TABLE "v" ("d");
+            ''')
+        self.connection.normalize(iter(['u', 't']))
+        self.assertEqual(self.tables(), ['u', 't'])
+        self.assertEqual(self.connection.execute(
+            'SELECT "name" FROM "sqlite6nf_column_name" ORDER BY "id";').fetchall(),
+                         [('c',), ('a',), ('b',)])
+        self.connection.normalize()
+        self.assertEqual(self.tables(), ['u', 't', 'v'])
+
+    def test_without_rowid(
+            self: 'TestNormalize',
+            ) -> None:
+        self.connection.executescript('''
+            CREATE TABLE "t" ("a");
+            CREATE TABLE "w" ("a" PRIMARY KEY, "b") WITHOUT ROWID;
+            INSERT INTO "w" VALUES (1, 1), (2, 2);
+            ''')
+        self.connection.normalize()
+        self.assertEqual(self.tables(), ['t'])
+        with self.assertRaises(sqlite3.OperationalError):
+            self.connection.normalize('w')
+        self.assertEqual(self.tables(), ['t'])
+
+
+class TestCursor(unittest.TestCase):
+    def test_plain_connection(
+            self: 'TestCursor',
+            ) -> None:
+        connection = sqlite3.connect(':memory:')
+        cursor = connection.cursor(sqlite6nf.Cursor)
+        self.assertEqual(cursor.execute('SELECT 1;').fetchall(), [(1,)])
+        cursor.executescript('CREATE TABLE "x" ("y");')
+        cursor.executemany('INSERT INTO "x" VALUES (?);', [(1,), (2,)])
+        self.assertEqual(cursor.execute('SELECT "y" FROM "x";').fetchall(), [(1,), (2,)])
+        connection.close()
+
+    def test_executescript(
+            self: 'TestCursor',
+            ) -> None:
+        connection = sqlite6nf.connect(':memory:')
+        connection.executescript('''
+            CREATE TABLE "x" ("y");
+            CREATE TABLE "z" ("length");
+            CREATE TRIGGER "w" AFTER INSERT ON "x" BEGIN
+                INSERT INTO "z" VALUES (length("NEW"."y"));
+                INSERT INTO "z" VALUES (0);
+            END;
+            INSERT INTO "x" VALUES ('a;b'); -- A comment; with a semicolon.
+            /* Another comment; */ SELECT 1;
+            INSERT INTO "x" VALUES (";")
+            ''')
+        self.assertEqual(connection.execute('SELECT "y" FROM "x";').fetchall(), [('a;b',), (';',)])
+        self.assertEqual(connection.execute('SELECT "length" FROM "z";').fetchall(), [(3,), (0,), (1,), (0,)])
+        self.assertFalse(connection.in_transaction)
+        self.assertEqual(connection.isolation_level, 'DEFERRED')
+        connection.close()
+
+    def test_executescript_literal(
+            self: 'TestCursor',
+            ) -> None:
+        connection = sqlite6nf.connect(':memory:')
+        literal = ';' * 40000
+        with mock.patch('sqlite3.complete_statement', wraps=sqlite3.complete_statement) as complete_statement:
+            connection.executescript('CREATE TABLE "x" ("y"); INSERT INTO "x" VALUES (\'{}\'\'\');'.format(literal))
+        self.assertEqual(complete_statement.call_count, 2)
+        self.assertEqual(connection.execute('SELECT "y" FROM "x";').fetchall(), [(literal + "'",)])
+        connection.close()
+
+    def test_executescript_pending_transaction(
+            self: 'TestCursor',
+            ) -> None:
+        connection = sqlite6nf.connect(':memory:')
+        connection.execute('CREATE TABLE "x" ("y");')
+        connection.execute('INSERT INTO "x" VALUES (1);')
+        connection.executescript('INSERT INTO "x" VALUES (2); BEGIN; INSERT INTO "x" VALUES (3);')
+        self.assertTrue(connection.in_transaction)
+        connection.rollback()
+        self.assertEqual(connection.execute('SELECT "y" FROM "x";').fetchall(), [(1,), (2,)])
+        connection.close()
+
+    def test_executescript_error(
+            self: 'TestCursor',
+            ) -> None:
+        connection = sqlite6nf.connect(':memory:')
+        with self.assertRaises(sqlite3.OperationalError):
+            connection.executescript('CREATE TABLE "x" ("y"); SELECT; CREATE TABLE "z" ("y");')
+        self.assertEqual(connection.execute('SELECT "name" FROM "sqlite_schema";').fetchall(), [('x',)])
+        self.assertEqual(connection.isolation_level, 'DEFERRED')
+        connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()